@@ -1,41 +1,37 @@
 import time
 import json
-import requests
-import cv2
-import pyaudio
 import wave
 import base64
 import io
 import os
+import random
 from threading import Thread
 from queue import Queue
 
+# Heavy/hardware modules (cv2, pyaudio, numpy, requests) are imported inside the
+# functions that need them, so this module can be imported and tested without a
+# camera, microphone or config.json.
+
+# ---------- Startup timing ----------
+
+# Monotonic reference for time-to-first-frame / time-to-first-score
+STARTUP_T0 = time.monotonic()
+startup_marks = {}
+
+
+def mark_startup(name):
+    """Record the first time a startup milestone is reached and report it."""
+    if name in startup_marks:
+        return
+    elapsed = time.monotonic() - STARTUP_T0
+    startup_marks[name] = round(elapsed, 3)
+    print(f"[Startup] {name}: {elapsed:.2f}s")
+
+
 # ---------- Config ----------
 
-with open("config.json") as f:
-    config = json.load(f)
-
-BACKEND_URL = config["api_endpoint"]
-OPENROUTER_KEY = config.get("openrouter_api_key", "")
-PRESAGE_KEY = config.get("presage_api_key", "")
-APP_ORIGIN = config.get("app_origin", "http://localhost")
-APP_TITLE = config.get("app_title", "Inference Hat")
-CAMERA_INDEX = config.get("camera_index", 0)
-
-# ElevenLabs configuration
-ELEVENLABS_API_KEY = config.get("elevenlabs_api_key", "")
-ELEVENLABS_VOICE_ID = config.get("elevenlabs_voice_id", "")
-ELEVENLABS_TTS_MODEL = config.get("elevenlabs_tts_model", "eleven_multilingual_v2")
-ELEVENLABS_STT_MODEL = config.get("elevenlabs_stt_model", "scribe_v2")
-ELEVENLABS_LANGUAGE_CODE = config.get("elevenlabs_language_code", "en")
-ELEVENLABS_BASE_URL = config.get("elevenlabs_base_url", "https://api.elevenlabs.io")
-ELEVENLABS_TTS_OUTPUT_FORMAT = config.get("elevenlabs_tts_output_format", "pcm_16000")
-ELEVENLABS_TIMEOUT = config.get("elevenlabs_timeout_s", 45)
-
-LIE_THRESHOLD = config.get("lie_threshold", 70)
-TRUTH_THRESHOLD = config.get("truth_threshold", 30)
-AUDIO_CALLOUT_COOLDOWN_S = config.get("audio_callout_cooldown_s", 12)
-HAT_AUDIO_CALLOUTS_ENABLED = config.get("hat_audio_callouts_enabled", False)
+CONFIG_PATH = "config.json"
+
 
 # Backend extras for hat callouts
 def _derive_backend_base(api_url):
@@ -46,10 +42,95 @@ def _derive_backend_base(api_url):
     return api_url.rstrip("/")
 
 
-BACKEND_BASE_URL = config.get("backend_base_url") or _derive_backend_base(BACKEND_URL)
-HAT_CALLOUT_ENDPOINT = config.get("hat_callout_endpoint") or (
-    f"{BACKEND_BASE_URL}/api/hat-callout" if BACKEND_BASE_URL else ""
-)
+def apply_config(config):
+    """Populate module settings from a config dict (missing keys use defaults)."""
+    global BACKEND_URL, OPENROUTER_KEY, OPENROUTER_MODEL, PRESAGE_KEY
+    global APP_ORIGIN, APP_TITLE, CAMERA_INDEX
+    global ELEVENLABS_API_KEY, ELEVENLABS_VOICE_ID, ELEVENLABS_TTS_MODEL
+    global ELEVENLABS_STT_MODEL, ELEVENLABS_LANGUAGE_CODE, ELEVENLABS_BASE_URL
+    global ELEVENLABS_TTS_OUTPUT_FORMAT, ELEVENLABS_TIMEOUT
+    global LIE_THRESHOLD, TRUTH_THRESHOLD, AUDIO_CALLOUT_COOLDOWN_S
+    global HAT_AUDIO_CALLOUTS_ENABLED, SESSION_STORE_ENABLED, SESSION_STORE_DIR
+    global FIRST_WINDOW_SECONDS, STARTUP_PREWARM_ENABLED, CADENCE_ENABLED
+    global BACKEND_BASE_URL, HAT_CALLOUT_ENDPOINT, GEMINI_MODEL
+
+    BACKEND_URL = config.get("api_endpoint", "")
+    OPENROUTER_KEY = config.get("openrouter_api_key", "")
+    OPENROUTER_MODEL = config.get("openrouter_model", "google/gemini-2.5-flash")
+    PRESAGE_KEY = config.get("presage_api_key", "")
+    APP_ORIGIN = config.get("app_origin", "http://localhost")
+    APP_TITLE = config.get("app_title", "Inference Hat")
+    CAMERA_INDEX = config.get("camera_index", 0)
+
+    # ElevenLabs configuration
+    ELEVENLABS_API_KEY = config.get("elevenlabs_api_key", "")
+    ELEVENLABS_VOICE_ID = config.get("elevenlabs_voice_id", "")
+    ELEVENLABS_TTS_MODEL = config.get("elevenlabs_tts_model", "eleven_multilingual_v2")
+    ELEVENLABS_STT_MODEL = config.get("elevenlabs_stt_model", "scribe_v2")
+    ELEVENLABS_LANGUAGE_CODE = config.get("elevenlabs_language_code", "en")
+    ELEVENLABS_BASE_URL = config.get("elevenlabs_base_url", "https://api.elevenlabs.io")
+    ELEVENLABS_TTS_OUTPUT_FORMAT = config.get("elevenlabs_tts_output_format", "pcm_16000")
+    ELEVENLABS_TIMEOUT = config.get("elevenlabs_timeout_s", 45)
+
+    LIE_THRESHOLD = config.get("lie_threshold", 70)
+    TRUTH_THRESHOLD = config.get("truth_threshold", 30)
+    AUDIO_CALLOUT_COOLDOWN_S = config.get("audio_callout_cooldown_s", 12)
+    HAT_AUDIO_CALLOUTS_ENABLED = config.get("hat_audio_callouts_enabled", False)
+
+    # Local memory-mapped record of every fused tick (see session_store.py)
+    SESSION_STORE_ENABLED = config.get("session_store_enabled", True)
+    SESSION_STORE_DIR = config.get("session_store_dir", "sessions")
+
+    # Startup: analyze a short first window so a score arrives soon after boot,
+    # and warm up network connections / TTS while capture fills.
+    FIRST_WINDOW_SECONDS = config.get("first_window_s", 5)
+    STARTUP_PREWARM_ENABLED = config.get("startup_prewarm_enabled", True)
+
+    # Adaptive cadence: skip or downgrade service calls when nothing changes
+    # (see cadence.py for the cadence_* tuning keys)
+    CADENCE_ENABLED = config.get("cadence_enabled", True)
+
+    BACKEND_BASE_URL = config.get("backend_base_url") or _derive_backend_base(BACKEND_URL)
+    HAT_CALLOUT_ENDPOINT = config.get("hat_callout_endpoint") or (
+        f"{BACKEND_BASE_URL}/api/hat-callout" if BACKEND_BASE_URL else ""
+    )
+
+    # Use a valid Gemini 3 Flash model string for the Gemini API
+    GEMINI_MODEL = config.get("gemini_model", "gemini-3-flash-preview")
+    # If user accidentally puts an OpenRouter-style "google/..." string, strip prefix
+    if GEMINI_MODEL.startswith("google/"):
+        GEMINI_MODEL = GEMINI_MODEL.split("/", 1)[1]
+
+
+def load_config(path=CONFIG_PATH):
+    """Read config.json and apply it. Called from main(), not at import."""
+    with open(path) as f:
+        config = json.load(f)
+    if "api_endpoint" not in config:
+        raise KeyError("api_endpoint")
+    apply_config(config)
+    return config
+
+
+# Defaults until load_config() runs
+apply_config({})
+
+GEMINI_API_URL = "https://generativelanguage.googleapis.com/v1beta"
+
+# ---------- HTTP session ----------
+
+_http_session = None
+
+
+def http():
+    """Shared requests.Session, so prewarmed DNS/TLS connections get reused."""
+    global _http_session
+    if _http_session is None:
+        import requests
+
+        _http_session = requests.Session()
+    return _http_session
+
 
 # Insult pools for ElevenLabs callouts
 LIE_INSULTS = [
@@ -68,23 +149,19 @@ TRUTH_INSULTS = [
 # Track cooldown for hat audio callouts
 last_callout_play_ts = 0
 
-# Use a valid Gemini 3 Flash model string for the Gemini API
-GEMINI_MODEL = config.get("gemini_model", "gemini-3-flash-preview")
-# If user accidentally puts an OpenRouter-style "google/..." string, strip prefix
-if GEMINI_MODEL.startswith("google/"):
-    GEMINI_MODEL = GEMINI_MODEL.split("/", 1)[1]
-
-GEMINI_API_URL = "https://generativelanguage.googleapis.com/v1beta"
+# Created in main() when cadence_enabled; decides which service calls to make
+cadence_controller = None
 
 # ---------- Audio configuration ----------
 
 CHUNK = 1024
-FORMAT = pyaudio.paInt16
+SAMPLE_WIDTH = 2  # 16-bit audio
 CHANNELS = 1
 RATE = 16000
 RECORD_SECONDS = 20  # Analyze every 20 seconds of audio
 
-# Queue for audio samples (each item is a list of raw frames)
+# Queue for audio samples: (window_start, frames), where window_start is the
+# wall-clock time the first frame was recorded and frames is a list of raw frames
 audio_queue = Queue()
 
 # ---------- Video configuration for Presage ----------
@@ -102,7 +179,7 @@ def audio_frames_to_wav_bytes(audio_frames, rate=RATE, channels=CHANNELS):
     wav_buffer = io.BytesIO()
     with wave.open(wav_buffer, "wb") as wav_file:
         wav_file.setnchannels(channels)
-        wav_file.setsampwidth(2)  # 16-bit audio
+        wav_file.setsampwidth(SAMPLE_WIDTH)
         wav_file.setframerate(rate)
         wav_file.writeframes(b"".join(audio_frames))
 
@@ -135,7 +212,7 @@ def transcribe_audio_elevenlabs(audio_frames):
     }
 
     try:
-        response = requests.post(
+        response = http().post(
             url,
             headers=headers,
             data=data,
@@ -161,7 +238,7 @@ def fetch_hat_callout_from_backend():
     if not HAT_AUDIO_CALLOUTS_ENABLED or not HAT_CALLOUT_ENDPOINT:
         return None
     try:
-        response = requests.get(HAT_CALLOUT_ENDPOINT, timeout=5)
+        response = http().get(HAT_CALLOUT_ENDPOINT, timeout=5)
         if response.status_code == 200:
             payload = response.json()
             if payload.get("pending") and payload.get("callout"):
@@ -171,10 +248,14 @@ def fetch_hat_callout_from_backend():
     return None
 
 
-def build_callout_text(callout):
-    """Craft the spoken text for a hat callout."""
+def build_callout_parts(callout):
+    """
+    Craft a hat callout as (spoken_text, insult). The insult is one of the
+    fixed lines, so it can be played from the prewarmed TTS cache after the
+    rest of the callout, which is synthesized in a single request.
+    """
     if not callout:
-        return ""
+        return "", ""
 
     guess = (callout.get("guess") or "").lower()
     player = callout.get("player") or callout.get("guesser") or "the guesser"
@@ -189,8 +270,8 @@ def build_callout_text(callout):
             else "Opposite translation: reality disagrees."
         )
         return (
-            f"Player {player} says you're lying about {quoted_statement}. "
-            f"{insult} {opposite}"
+            f"Player {player} says you're lying about {quoted_statement}. {opposite}",
+            insult,
         )
 
     if guess == "truth":
@@ -201,11 +282,11 @@ def build_callout_text(callout):
             else "Validated truth on record."
         )
         return (
-            f"Player {player} begrudgingly says you're telling the truth. "
-            f"{validation} {insult}"
+            f"Player {player} begrudgingly says you're telling the truth. {validation}",
+            insult,
         )
 
-    return ""
+    return "", ""
 
 
 def parse_pcm_settings(fmt):
@@ -228,6 +309,8 @@ def play_pcm_audio(audio_bytes, playback_settings):
     if not audio_bytes:
         return False
 
+    import pyaudio
+
     p = pyaudio.PyAudio()
     try:
         stream = p.open(
@@ -249,19 +332,12 @@ def play_pcm_audio(audio_bytes, playback_settings):
         p.terminate()
 
 
-def speak_text_elevenlabs(text):
-    """Convert text to speech via ElevenLabs and play it out loud."""
-    if not text:
-        return False
-    if not (ELEVENLABS_API_KEY and ELEVENLABS_VOICE_ID):
-        print("Hat callout skipped: ElevenLabs credentials missing.")
-        return False
+# Synthesized PCM for fixed phrases (insults), filled by prewarm_tts_cache()
+tts_cache = {}
 
-    playback_settings = parse_pcm_settings(ELEVENLABS_TTS_OUTPUT_FORMAT)
-    if not playback_settings:
-        print("Hat callout skipped: pcm_* output format required.")
-        return False
 
+def synthesize_speech_elevenlabs(text):
+    """Convert text to PCM bytes via ElevenLabs."""
     url = f"{ELEVENLABS_BASE_URL.rstrip('/')}/v1/text-to-speech/{ELEVENLABS_VOICE_ID}/stream"
     params = {"output_format": ELEVENLABS_TTS_OUTPUT_FORMAT}
     headers = {
@@ -280,7 +356,7 @@ def speak_text_elevenlabs(text):
     }
 
     try:
-        response = requests.post(
+        response = http().post(
             url,
             params=params,
             headers=headers,
@@ -290,17 +366,38 @@ def speak_text_elevenlabs(text):
         )
         if response.status_code != 200:
             print(f"ElevenLabs TTS error: {response.status_code} - {response.text[:200]}")
-            return False
+            return None
         audio_chunks = []
         for chunk in response.iter_content(chunk_size=4096):
             if chunk:
                 audio_chunks.append(chunk)
-        audio_bytes = b"".join(audio_chunks)
-        return play_pcm_audio(audio_bytes, playback_settings)
+        return b"".join(audio_chunks)
     except Exception as exc:
         print(f"ElevenLabs TTS request failed: {exc}")
+        return None
+
+
+def speak_text_elevenlabs(text, suffix_audio=b""):
+    """
+    Convert text to speech via ElevenLabs and play it out loud, followed by
+    suffix_audio (already synthesized PCM, e.g. a cached insult).
+    """
+    if not text:
+        return False
+    if not (ELEVENLABS_API_KEY and ELEVENLABS_VOICE_ID):
+        print("Hat callout skipped: ElevenLabs credentials missing.")
         return False
 
+    playback_settings = parse_pcm_settings(ELEVENLABS_TTS_OUTPUT_FORMAT)
+    if not playback_settings:
+        print("Hat callout skipped: pcm_* output format required.")
+        return False
+
+    audio_bytes = synthesize_speech_elevenlabs(text)
+    if audio_bytes is None:
+        return False
+    return play_pcm_audio(audio_bytes + suffix_audio, playback_settings)
+
 
 def process_hat_callouts():
     """Poll backend for player decisions and speak callouts."""
@@ -315,38 +412,64 @@ def process_hat_callouts():
     if not callout:
         return
 
-    text = build_callout_text(callout)
+    text, insult = build_callout_parts(callout)
     if not text:
         return
 
-    print(f"[Hat] Playing callout: {text}")
-    if speak_text_elevenlabs(text):
+    print(f"[Hat] Playing callout: {text} {insult}")
+    if insult in tts_cache:
+        spoken = speak_text_elevenlabs(text, suffix_audio=tts_cache[insult])
+    else:
+        # Not prewarmed: still a single TTS request for the whole callout
+        spoken = speak_text_elevenlabs(f"{text} {insult}")
+    if spoken:
         last_callout_play_ts = time.time()
 
 
+def _window_seconds(full_seconds, first, stream):
+    """Length of the next capture window; the first one is kept short."""
+    if cadence_controller:
+        full_seconds = cadence_controller.window_seconds(stream)
+    if first and 0 < FIRST_WINDOW_SECONDS < full_seconds:
+        return FIRST_WINDOW_SECONDS
+    return full_seconds
+
+
 def audio_capture_thread():
     """Continuously captures microphone input and enqueues 20s chunks."""
-    p = pyaudio.PyAudio()
-    print("Starting audio capture...")
+    import pyaudio
 
-    stream = p.open(
-        format=FORMAT,
-        channels=CHANNELS,
-        rate=RATE,
-        input=True,
-        frames_per_buffer=CHUNK,
-    )
+    print("Starting audio capture...")
+    p = pyaudio.PyAudio()
+    try:
+        stream = p.open(
+            format=p.get_format_from_width(SAMPLE_WIDTH),
+            channels=CHANNELS,
+            rate=RATE,
+            input=True,
+            frames_per_buffer=CHUNK,
+        )
+    except Exception as e:
+        print(f"Audio capture error: {e}")
+        p.terminate()
+        return
 
     print("Audio stream opened. Recording...")
+    mark_startup("microphone_open")
 
     try:
-        frames_per_20s = int(RATE / CHUNK * RECORD_SECONDS)
+        first = True
         while True:
+            frames_per_window = int(RATE / CHUNK * _window_seconds(RECORD_SECONDS, first, "audio"))
             frames = []
-            for _ in range(frames_per_20s):
+            for _ in range(frames_per_window):
                 data = stream.read(CHUNK, exception_on_overflow=False)
                 frames.append(data)
-            audio_queue.put(frames)
+                mark_startup("first_audio_frame")
+            # Reads block in real time, so the window began one window ago
+            window_start = time.time() - len(frames) * CHUNK / RATE
+            audio_queue.put((window_start, frames))
+            first = False
     except Exception as e:
         print(f"Audio capture error: {e}")
     finally:
@@ -360,12 +483,14 @@ def analyze_audio_gemini(audio_frames, transcript_hint=""):
     """
     Send a 20s audio chunk to Gemini 3 Flash via the Gemini API.
     Expects the model to return JSON with transcript, deception_score, reasoning.
+    Results that did not come from the model are marked with "fallback".
     """
-    if not GEMINI_API_KEY:
+    if not OPENROUTER_KEY:
         return {
             "deception_score": 0.5,
             "reasoning": "OpenRouter API key not configured",
             "transcript": "",
+            "fallback": True,
         }
 
     if not audio_frames:
@@ -373,6 +498,7 @@ def analyze_audio_gemini(audio_frames, transcript_hint=""):
             "deception_score": 0.5,
             "reasoning": "No audio data",
             "transcript": "",
+            "fallback": True,
         }
 
     base64_audio = audio_to_base64_wav(audio_frames)
@@ -400,7 +526,7 @@ Return a JSON object with:
         )
 
     try:
-        response = requests.post(
+        response = http().post(
             "https://openrouter.ai/api/v1/chat/completions",
             headers={
                 "Authorization": f"Bearer {OPENROUTER_KEY}",
@@ -503,6 +629,7 @@ Return a JSON object with:
             "deception_score": 0.5,
             "reasoning": f"API error: {response.status_code}",
             "transcript": "",
+            "fallback": True,
         }
 
     except Exception as e:
@@ -511,6 +638,7 @@ Return a JSON object with:
             "deception_score": 0.5,
             "reasoning": f"Request failed: {str(e)}",
             "transcript": "",
+            "fallback": True,
         }
 
 # ---------- Presage API integration ----------
@@ -530,9 +658,13 @@ def mock_presage_data():
         },
     }
 
-def analyze_video_presage(video_frames):
+def presage_configured():
+    return bool(PRESAGE_KEY) and "YOUR_" not in PRESAGE_KEY
+
+
+def analyze_video_presage(video_frames, fps=VIDEO_FPS):
     """Analyze video frames using Presage API if key is provided, else mock."""
-    if not PRESAGE_KEY or "YOUR_" in PRESAGE_KEY:
+    if not presage_configured():
         print("Presage API key not configured, using mock data")
         return mock_presage_data()
 
@@ -541,10 +673,12 @@ def analyze_video_presage(video_frames):
 
     # Create MP4 video in temporary file
     try:
+        import cv2
+
         height, width, _ = video_frames[0].shape
         fourcc = cv2.VideoWriter_fourcc(*'mp4v')
         temp_filename = 'temp.mp4'
-        writer = cv2.VideoWriter(temp_filename, fourcc, VIDEO_FPS, (width, height), True)
+        writer = cv2.VideoWriter(temp_filename, fourcc, fps, (width, height), True)
 
         for frame in video_frames:
             writer.write(frame)
@@ -560,7 +694,7 @@ def analyze_video_presage(video_frames):
 
         # Send to Presage API
         # NOTE: Replace 'https://physiology.presagetech.com/api/v1/analyze' with the actual Presage API endpoint for video analysis if different
-        response = requests.post(
+        response = http().post(
             "TrUTXUlCZp9YslujE0dsA4wHS7hk1wnKauw9IGJY",
             headers={
                 "Authorization": f"Bearer {PRESAGE_KEY}",
@@ -600,41 +734,98 @@ def analyze_video_presage(video_frames):
 
 def video_capture_thread():
     """Continuously captures video frames and enqueues 20s chunks."""
+    import cv2
+
     cap = cv2.VideoCapture(CAMERA_INDEX)
     if not cap.isOpened():
         print("Error opening video capture")
         return
 
     print("Video capture started...")
+    mark_startup("camera_open")
 
     frames = []
-    frames_per_20s = VIDEO_FPS * VIDEO_SECONDS
+    # Sized once per window, not per frame
+    frames_per_window = int(VIDEO_FPS * _window_seconds(VIDEO_SECONDS, True, "video"))
 
     try:
         while True:
             ret, frame = cap.read()
             if ret:
                 frames.append(frame)
-            if len(frames) >= frames_per_20s:
-                video_queue.put(frames[:frames_per_20s])
-                frames = frames[frames_per_20s:]  # Overlap if more
+                mark_startup("first_video_frame")
+            if len(frames) >= frames_per_window:
+                video_queue.put(frames[:frames_per_window])
+                frames = frames[frames_per_window:]  # Overlap if more
+                frames_per_window = int(
+                    VIDEO_FPS * _window_seconds(VIDEO_SECONDS, False, "video")
+                )
             time.sleep(1 / VIDEO_FPS)
     except Exception as e:
         print(f"Video capture error: {e}")
     finally:
         cap.release()
 
+# ---------- Startup prewarm ----------
+
+def prewarm_connections():
+    """Resolve DNS and complete TLS handshakes for every service we will call."""
+    origins = [
+        BACKEND_BASE_URL,
+        "https://openrouter.ai" if OPENROUTER_KEY else "",
+        ELEVENLABS_BASE_URL if ELEVENLABS_API_KEY else "",
+    ]
+    for origin in origins:
+        if not origin:
+            continue
+        try:
+            http().head(origin, timeout=5)
+        except Exception as exc:
+            print(f"Prewarm failed for {origin}: {exc}")
+    mark_startup("network_warm")
+
+
+def prewarm_tts_cache():
+    """Synthesize the fixed insult lines ahead of the first callout."""
+    if not (HAT_AUDIO_CALLOUTS_ENABLED and ELEVENLABS_API_KEY and ELEVENLABS_VOICE_ID):
+        return
+    if not parse_pcm_settings(ELEVENLABS_TTS_OUTPUT_FORMAT):
+        return
+    for text in LIE_INSULTS + TRUTH_INSULTS:
+        audio_bytes = synthesize_speech_elevenlabs(text)
+        if audio_bytes:
+            tts_cache[text] = audio_bytes
+    mark_startup("tts_cache_warm")
+
+
+def startup_prewarm():
+    """Warm the network path and TTS cache while the capture windows fill."""
+    prewarm_connections()
+    prewarm_tts_cache()
+
 # ---------- Main loop ----------
 
 def main():
+    global cadence_controller
+
     print("Starting AI Inference Hat (Gemini 3 Flash, 20s audio/video)...")
+    config = load_config()
 
+    if CADENCE_ENABLED:
+        from cadence import CadenceController
+
+        cadence_controller = CadenceController(config)
+
+    # Camera and microphone open concurrently; neither waits on the other
     audio_thread = Thread(target=audio_capture_thread, daemon=True)
     audio_thread.start()
 
     video_thread = Thread(target=video_capture_thread, daemon=True)
     video_thread.start()
 
+    if STARTUP_PREWARM_ENABLED:
+        Thread(target=startup_prewarm, daemon=True).start()
+
     gemini_analysis = {
         "deception_score": 0.5,
         "reasoning": "Initializing...",
@@ -643,28 +834,100 @@ def main():
 
     presage_data = mock_presage_data()  # Initial mock with fixed values
 
+    # Nothing has been analyzed yet; the first fused score is reported below
+    have_analysis = False
+
+    session_writer = None
+    if SESSION_STORE_ENABLED:
+        try:
+            from session_store import SessionWriter
+
+            session_writer = SessionWriter(SESSION_STORE_DIR)
+            print(f"Recording session to {session_writer.session_dir}")
+        except Exception as e:
+            print(f"Session store disabled: {e}")
+
     try:
         while True:
-            # When a new 20-second audio chunk is ready, analyze it
+            # When a new audio chunk is ready, analyze it (as far as the
+            # cadence controller thinks it is worth the budget)
             if not audio_queue.empty():
-                current_audio = audio_queue.get()
-                print("Analyzing 20s audio chunk (ElevenLabs STT + Gemini)...")
-                stt_result = transcribe_audio_elevenlabs(current_audio)
-                transcript_hint = stt_result.get("text", "")
-                if transcript_hint:
-                    print(f"[ElevenLabs STT] Transcript: {transcript_hint[:80]}{'...' if len(transcript_hint) > 80 else ''}")
-                gemini_analysis = analyze_audio_gemini(current_audio, transcript_hint=transcript_hint)
-                if transcript_hint and not gemini_analysis.get("transcript"):
-                    gemini_analysis["transcript"] = transcript_hint
-                if stt_result.get("words"):
-                    gemini_analysis["words"] = stt_result["words"]
-                print(f"Transcript used: {gemini_analysis.get('transcript', 'N/A')}")
-
-            # When a new 20-second video chunk is ready, analyze it
+                window_start, current_audio = audio_queue.get()
+                plan = (
+                    cadence_controller.plan_audio(current_audio)
+                    if cadence_controller
+                    else {"stt": True, "llm": True}
+                )
+                if plan["stt"] or plan["llm"]:
+                    print(f"Analyzing {len(current_audio) * CHUNK / RATE:.0f}s audio chunk (ElevenLabs STT + Gemini)...")
+                    stt_result = {"text": "", "words": []}
+                    if plan["stt"]:
+                        started = time.monotonic()
+                        stt_result = transcribe_audio_elevenlabs(current_audio)
+                        if cadence_controller and ELEVENLABS_API_KEY:
+                            cadence_controller.record("stt", time.monotonic() - started)
+                    transcript_hint = stt_result.get("text", "")
+                    if transcript_hint:
+                        print(f"[ElevenLabs STT] Transcript: {transcript_hint[:80]}{'...' if len(transcript_hint) > 80 else ''}")
+                    if plan["llm"]:
+                        started = time.monotonic()
+                        gemini_analysis = analyze_audio_gemini(current_audio, transcript_hint=transcript_hint)
+                        if cadence_controller and OPENROUTER_KEY:
+                            cadence_controller.record("llm", time.monotonic() - started)
+                    else:
+                        # Transcript only: keep the previous deception score,
+                        # but not the previous window's words or transcript
+                        reasoning = gemini_analysis.get("reasoning", "")
+                        if not reasoning.startswith("[carried over]"):
+                            reasoning = f"[carried over] {reasoning}"
+                        gemini_analysis = {
+                            key: value
+                            for key, value in gemini_analysis.items()
+                            if key not in ("words", "transcript")
+                        }
+                        gemini_analysis["reasoning"] = reasoning
+                    if transcript_hint and not gemini_analysis.get("transcript"):
+                        gemini_analysis["transcript"] = transcript_hint
+                    if stt_result.get("words"):
+                        gemini_analysis["words"] = stt_result["words"]
+                    # ElevenLabs word times are relative to this window
+                    gemini_analysis["window_start"] = window_start
+                    print(f"Transcript used: {gemini_analysis.get('transcript', 'N/A')}")
+                    # Only a real answer counts towards time-to-first-score
+                    if "raw" in stt_result or (
+                        plan["llm"] and not gemini_analysis.get("fallback")
+                    ):
+                        have_analysis = True
+                else:
+                    print(f"[Cadence] Skipping quiet audio chunk (energy {plan['energy']})")
+
+            # When a new video chunk is ready, analyze it
             if not video_queue.empty():
                 current_video = video_queue.get()
-                print("Analyzing 20s video chunk with Presage...")
-                presage_data = analyze_video_presage(current_video)
+                plan = (
+                    cadence_controller.plan_video(current_video)
+                    if cadence_controller
+                    else {"presage": True, "frame_step": 1, "scale": 1.0}
+                )
+                if plan["presage"]:
+                    print(f"Analyzing {len(current_video) / VIDEO_FPS:.0f}s video chunk with Presage...")
+                    fps = VIDEO_FPS
+                    if plan["frame_step"] > 1 or plan["scale"] < 1.0:
+                        from cadence import downsample_frames
+
+                        current_video = downsample_frames(
+                            current_video, plan["frame_step"], plan["scale"]
+                        )
+                        fps = VIDEO_FPS / plan["frame_step"]
+                    started = time.monotonic()
+                    presage_data = analyze_video_presage(current_video, fps=fps)
+                    if cadence_controller and presage_configured():
+                        cadence_controller.record("presage", time.monotonic() - started)
+                        cadence_controller.observe_heart_rate(presage_data.get("heart_rate"))
+                    if presage_configured():
+                        have_analysis = True
+                else:
+                    print(f"[Cadence] Skipping still video chunk (motion {plan['motion']})")
 
             # Simple sensor fusion of physiology + audio analysis
             W_stress = 0.3
@@ -692,9 +955,20 @@ def main():
                     "gemini": gemini_analysis,
                 },
             }
+            if cadence_controller:
+                payload["metrics"]["cadence"] = cadence_controller.report()
+
+            if have_analysis:
+                mark_startup("first_score")
+
+            if session_writer:
+                try:
+                    session_writer.append(payload)
+                except Exception as e:
+                    print(f"Session store error: {e}")
 
             try:
-                response = requests.post(BACKEND_URL, json=payload)
+                response = http().post(BACKEND_URL, json=payload)
                 transcript_preview = gemini_analysis.get("transcript", "")[:50]
                 print(f"\n{'='*60}")
                 print(
@@ -713,6 +987,11 @@ def main():
 
     except KeyboardInterrupt:
         print("\nStopping...")
+    finally:
+        if session_writer:
+            session_writer.close()
+        if cadence_controller:
+            print(f"[Cadence] Budget spent this game: {json.dumps(cadence_controller.report())}")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,290 @@
+"""
+Adaptive analysis cadence for the inference hat.
+
+Instead of sending every capture window to ElevenLabs STT, OpenRouter and
+Presage, the controller looks at cheap local change detectors (audio energy,
+frame-difference motion, heart-rate delta) plus the measured latency of each
+service, and decides per window whether to call a service and at what
+fidelity. Calls are paid for out of a token bucket refilled at
+calls_per_minute, where each call costs its configured weight
+(cadence_service_costs, 1.0 = one call). Budget saved up while nothing
+happens is spent on shorter, fresher windows once the signal changes. The
+spend is reported per game (one run of the hat).
+"""
+
+import math
+import time
+from threading import Lock
+
+SERVICES = ("stt", "llm", "presage")
+
+# Services fed by each capture stream; each stream sizes its own window.
+STREAM_SERVICES = {
+    "audio": ("stt", "llm"),
+    "video": ("presage",),
+}
+
+# EMA weight for noise floor and latency tracking
+EMA_ALPHA = 0.2
+
+
+# ---------- Change detectors ----------
+
+def audio_energy(audio_frames):
+    """RMS level of 16-bit PCM frames, normalised to 0..1."""
+    if not audio_frames:
+        return 0.0
+    import numpy as np
+
+    samples = np.frombuffer(b"".join(audio_frames), dtype=np.int16)
+    if not len(samples):
+        return 0.0
+    rms = np.sqrt(np.mean(samples.astype(np.float32) ** 2))
+    return float(rms / 32768.0)
+
+
+def motion_score(video_frames, samples=8, stride=8):
+    """
+    Mean absolute difference between a few evenly spaced, subsampled frames,
+    normalised to 0..1. Only ~samples small grayscale images are touched.
+    """
+    if not video_frames or len(video_frames) < 2:
+        return 0.0
+    import numpy as np
+
+    step = max(1, len(video_frames) // samples)
+    picked = video_frames[::step]
+    previous = None
+    diffs = []
+    for frame in picked:
+        small = frame[::stride, ::stride]
+        if small.ndim == 3:
+            small = small.mean(axis=2)
+        small = small.astype(np.float32)
+        if previous is not None:
+            diffs.append(float(np.mean(np.abs(small - previous))))
+        previous = small
+    if not diffs:
+        return 0.0
+    return sum(diffs) / len(diffs) / 255.0
+
+
+def downsample_frames(video_frames, frame_step=1, scale=1.0):
+    """Keep every frame_step-th frame, resized by scale (nearest neighbour)."""
+    frames = video_frames[::frame_step] if frame_step > 1 else video_frames
+    if scale >= 1.0:
+        return frames
+    import numpy as np
+
+    stride = max(1, int(round(1 / scale)))
+    # VideoWriter needs contiguous buffers, not strided views
+    return [np.ascontiguousarray(frame[::stride, ::stride]) for frame in frames]
+
+
+# ---------- Controller ----------
+
+class CadenceController:
+    """Per-window call planner under a calls-per-minute budget."""
+
+    def __init__(self, config=None):
+        config = config or {}
+        self.calls_per_minute = float(config.get("cadence_calls_per_minute", 9))
+        self.min_window_s = config.get("cadence_min_window_s", 8)
+        self.max_window_s = config.get("cadence_max_window_s", 30)
+        self.max_stale_s = config.get("cadence_max_stale_s", 60)
+        self.speech_ratio = config.get("cadence_speech_ratio", 2.0)
+        self.min_speech_energy = config.get("cadence_min_speech_energy", 0.01)
+        self.motion_threshold = config.get("cadence_motion_threshold", 0.02)
+        self.hr_delta_threshold = config.get("cadence_hr_delta_bpm", 8)
+        self.costs = {service: 1.0 for service in SERVICES}
+        self.costs.update(config.get("cadence_service_costs", {}))
+
+        # Token bucket in cost units: at most half a minute of budget (and at
+        # least one full window) can be spent in a burst
+        self.capacity = max(self._window_cost(), self.calls_per_minute / 2)
+        self.tokens = self.capacity
+        self._refill_ts = time.monotonic()
+        # Capture threads read the bucket while the main loop charges it
+        self._lock = Lock()
+
+        self.started = time.time()
+        self.noise_floor = None
+        self.last_heart_rate = None
+        self.hr_delta = 0.0
+        self.audio_active = True
+        self.video_active = True
+        self.latency = {service: None for service in SERVICES}
+        self.last_call = {service: 0.0 for service in SERVICES}
+        self.calls = {service: 0 for service in SERVICES}
+        self.skips = {service: 0 for service in SERVICES}
+        self.spent = 0.0
+
+    # ----- budget -----
+
+    def _window_cost(self, services=SERVICES):
+        return sum(self.costs[service] for service in services)
+
+    def _peek_tokens(self):
+        """Current bucket level, without updating it. Caller holds the lock."""
+        elapsed = time.monotonic() - self._refill_ts
+        return min(self.capacity, self.tokens + elapsed * self.calls_per_minute / 60.0)
+
+    def _refill(self):
+        with self._lock:
+            self.tokens = self._peek_tokens()
+            self._refill_ts = time.monotonic()
+
+    def _can_afford(self, services):
+        self._refill()
+        return self.tokens >= self._window_cost(services)
+
+    def _stale(self, service):
+        return time.time() - self.last_call[service] >= self.max_stale_s
+
+    def _stream_latency(self, stream):
+        latencies = [
+            self.latency[service]
+            for service in STREAM_SERVICES[stream]
+            if self.latency[service] is not None
+        ]
+        return max(latencies) if latencies else None
+
+    def _budget_window(self, stream):
+        """
+        Window length the budget asks for, before the latency clamp.
+
+        When the stream is quiet, stretch to max_window_s and let the bucket
+        refill. While it is changing, start from the window the budget
+        sustains indefinitely and shorten it towards min_window_s in
+        proportion to the saved-up surplus.
+        """
+        active = self.audio_active if stream == "audio" else self.video_active
+        if not active:
+            return float(self.max_window_s)
+        with self._lock:
+            tokens = self._peek_tokens()
+        sustainable = 60.0 * self._window_cost() / max(self.calls_per_minute, 1e-6)
+        surplus = max(0.0, min(1.0, tokens / self.capacity))
+        window = sustainable - (sustainable - self.min_window_s) * surplus
+        return min(self.max_window_s, max(self.min_window_s, window))
+
+    def _too_slow(self, service):
+        """A service slower than its stream's budget window falls behind each call."""
+        stream = next(name for name, services in STREAM_SERVICES.items() if service in services)
+        latency = self.latency[service]
+        return latency is not None and latency > self._budget_window(stream)
+
+    def window_seconds(self, stream):
+        """
+        Next capture window for "audio" or "video", in whole seconds. Never
+        shorter than that stream's slowest measured service latency (up to
+        max_window_s), which would only queue work up. Does not touch the
+        bucket, so capture threads can call it freely.
+        """
+        window = self._budget_window(stream)
+        seconds = int(round(window))
+        latency = self._stream_latency(stream)
+        if latency is not None and seconds < latency:
+            seconds = min(int(self.max_window_s), math.ceil(latency))
+        return seconds
+
+    # ----- planning -----
+
+    def plan_audio(self, audio_frames):
+        """Decide whether to run STT and the LLM on this audio window."""
+        energy = audio_energy(audio_frames)
+        if self.noise_floor is None:
+            self.noise_floor = energy
+        speech = energy >= max(self.min_speech_energy, self.noise_floor * self.speech_ratio)
+        if not speech:
+            # Only silence updates the floor, so speech does not raise it
+            self.noise_floor += EMA_ALPHA * (energy - self.noise_floor)
+
+        self.audio_active = speech
+        wanted = speech or self._stale("llm")
+        plan = {"stt": False, "llm": False, "energy": round(energy, 4), "speech": speech}
+        if wanted and self._can_afford(("stt", "llm")):
+            plan["stt"] = plan["llm"] = True
+        elif wanted:
+            # Only room for one: prefer the deception score, unless the LLM is
+            # slower than the budget window, then at least keep the transcript
+            preferred = ("stt", "llm") if self._too_slow("llm") else ("llm", "stt")
+            for service in preferred:
+                if self._can_afford((service,)):
+                    plan[service] = True
+                    break
+
+        for service in ("stt", "llm"):
+            if not plan[service]:
+                self.skips[service] += 1
+        return plan
+
+    def observe_heart_rate(self, heart_rate):
+        """Feed a fresh Presage heart rate; a jump keeps video sampling dense."""
+        if heart_rate is None:
+            return
+        if self.last_heart_rate is not None:
+            self.hr_delta = abs(heart_rate - self.last_heart_rate)
+        self.last_heart_rate = heart_rate
+
+    def plan_video(self, video_frames):
+        """Decide whether, and at what fidelity, to upload this window to Presage."""
+        motion = motion_score(video_frames)
+        changing = motion >= self.motion_threshold or self.hr_delta >= self.hr_delta_threshold
+
+        plan = {
+            "presage": False,
+            "frame_step": 1,
+            "scale": 1.0,
+            "motion": round(motion, 4),
+        }
+        if (changing or self._stale("presage")) and self._can_afford(("presage",)):
+            plan["presage"] = True
+            # Trade resolution and frame count for freshness when this call
+            # would leave less than a full window of budget, or Presage is
+            # lagging, rather than skipping the window entirely.
+            with self._lock:
+                remaining = self.tokens - self.costs["presage"]
+            if remaining < self._window_cost() or self._too_slow("presage"):
+                plan["frame_step"] = 2
+                plan["scale"] = 0.5
+        else:
+            self.skips["presage"] += 1
+
+        self.video_active = changing
+        return plan
+
+    # ----- accounting -----
+
+    def record(self, service, latency_s):
+        """Charge the budget for a completed call and update its latency EMA."""
+        with self._lock:
+            self.tokens = self._peek_tokens() - self.costs[service]
+            self._refill_ts = time.monotonic()
+        self.calls[service] += 1
+        self.spent += self.costs[service]
+        self.last_call[service] = time.time()
+        previous = self.latency[service]
+        if previous is None:
+            self.latency[service] = latency_s
+        else:
+            self.latency[service] = previous + EMA_ALPHA * (latency_s - previous)
+
+    def report(self):
+        """Budget spent so far this game."""
+        # Floor at one minute so the rate is not inflated right after boot
+        minutes = max((time.time() - self.started) / 60.0, 1.0)
+        total_calls = sum(self.calls.values())
+        return {
+            "calls": dict(self.calls),
+            "skipped": dict(self.skips),
+            "cost": round(self.spent, 3),
+            "calls_per_minute": round(total_calls / minutes, 2),
+            "budget_calls_per_minute": self.calls_per_minute,
+            "tokens_left": round(self.tokens, 2),
+            "latency_s": {
+                service: round(latency, 2) if latency is not None else None
+                for service, latency in self.latency.items()
+            },
+            "window_s": {stream: self.window_seconds(stream) for stream in STREAM_SERVICES},
+        }
@@ -0,0 +1,451 @@
+"""
+Memory-mapped session store for the inference hat.
+
+Each game session lives in its own directory:
+
+    <root>/<session_id>/
+        meta.json                 schema + segment capacity
+        seg_00000/<column>.f8     one fixed-width NumPy memmap per column
+        transcripts.idx           fixed-width index into strings.bin
+        words.idx                 fixed-width word timings, also into strings.bin
+        strings.bin               append-only UTF-8 blob
+
+Segments are preallocated and filled with NaN timestamps, so appending a tick
+is a handful of scalar writes into mapped pages and the number of valid rows
+can always be recovered from disk, even after a crash.
+"""
+
+import json
+import os
+import time
+
+import numpy as np
+
+# ---------- Schema ----------
+
+# Numeric columns recorded on every tick, in payload order.
+COLUMNS = (
+    "timestamp",
+    "lie_probability",
+    "heart_rate",
+    "breathing_rate",
+    "stress_index",
+    "engagement",
+    "fear",
+    "deception_score",
+)
+COLUMN_DTYPE = np.float64
+
+# Each tick also points at the transcript that was current when it was scored.
+TRANSCRIPT_ID_COLUMN = "transcript_id"
+TRANSCRIPT_ID_DTYPE = np.int32
+
+# 8192 rows ~= 68 minutes at 2 Hz, ~0.5 MB per segment for all columns.
+DEFAULT_SEGMENT_ROWS = 8192
+INDEX_GROW_ROWS = 1024
+
+# timestamp is the tick that first posted the transcript; window_start is when
+# the audio it came from started recording (NaN if unknown).
+TRANSCRIPT_DTYPE = np.dtype(
+    [("timestamp", "f8"), ("window_start", "f8"), ("offset", "u8"), ("length", "u4")]
+)
+# Word start/end are absolute timestamps (window_start + ElevenLabs offset).
+WORD_DTYPE = np.dtype(
+    [
+        ("transcript_id", "i4"),
+        ("start", "f8"),
+        ("end", "f8"),
+        ("offset", "u8"),
+        ("length", "u4"),
+    ]
+)
+
+META_FILENAME = "meta.json"
+STRINGS_FILENAME = "strings.bin"
+TRANSCRIPTS_FILENAME = "transcripts.idx"
+WORDS_FILENAME = "words.idx"
+
+
+def _segment_dir(session_dir, segment_no):
+    return os.path.join(session_dir, f"seg_{segment_no:05d}")
+
+
+def _column_dtype(column):
+    return TRANSCRIPT_ID_DTYPE if column == TRANSCRIPT_ID_COLUMN else COLUMN_DTYPE
+
+
+def _column_path(segment_dir, column):
+    suffix = np.dtype(_column_dtype(column)).str[1:]
+    return os.path.join(segment_dir, f"{column}.{suffix}")
+
+
+def _list_segments(session_dir):
+    return sorted(
+        name
+        for name in os.listdir(session_dir)
+        if name.startswith("seg_") and os.path.isdir(os.path.join(session_dir, name))
+    )
+
+
+def _valid_rows(timestamps):
+    """Number of filled rows in a NaN-initialised timestamp column."""
+    filled = ~np.isnan(timestamps)
+    if filled.all():
+        return len(timestamps)
+    return int(np.argmin(filled))
+
+
+def _transcript_key(window_start, transcript):
+    """Identity of one analysed window's transcript (NaN window_start -> None)."""
+    if window_start is None or np.isnan(window_start):
+        window_start = None
+    return window_start, transcript
+
+
+def _open_index(path, dtype, mode):
+    """Open a fixed-width index file, or None if it is empty/missing."""
+    if not os.path.exists(path) or os.path.getsize(path) < dtype.itemsize:
+        return None
+    return np.memmap(path, dtype=dtype, mode=mode)
+
+
+def _fill_count(index):
+    """Rows used in an index memmap (unused slots have a NaN timestamp/start)."""
+    if index is None:
+        return 0
+    key = "timestamp" if "timestamp" in index.dtype.names else "start"
+    return _valid_rows(index[key])
+
+
+# ---------- Writer ----------
+
+class SessionWriter:
+    """Append-only writer for one session directory."""
+
+    def __init__(self, root, session_id=None, segment_rows=DEFAULT_SEGMENT_ROWS):
+        self.session_id = session_id or time.strftime("%Y%m%d-%H%M%S")
+        self.session_dir = os.path.join(root, self.session_id)
+        os.makedirs(self.session_dir, exist_ok=True)
+
+        meta_path = os.path.join(self.session_dir, META_FILENAME)
+        if os.path.exists(meta_path):
+            with open(meta_path) as f:
+                segment_rows = json.load(f)["segment_rows"]
+        else:
+            with open(meta_path, "w") as f:
+                json.dump(
+                    {
+                        "columns": list(COLUMNS),
+                        "segment_rows": segment_rows,
+                        "created": time.time(),
+                    },
+                    f,
+                )
+        self.segment_rows = segment_rows
+
+        segments = _list_segments(self.session_dir)
+        self._segment_no = len(segments) - 1 if segments else 0
+        self._open_segment(self._segment_no)
+        self._row = _valid_rows(self._columns["timestamp"])
+
+        self._strings = open(os.path.join(self.session_dir, STRINGS_FILENAME), "ab")
+        self._transcripts = _open_index(
+            os.path.join(self.session_dir, TRANSCRIPTS_FILENAME), TRANSCRIPT_DTYPE, "r+"
+        )
+        self._words = _open_index(
+            os.path.join(self.session_dir, WORDS_FILENAME), WORD_DTYPE, "r+"
+        )
+        self._transcript_count = _fill_count(self._transcripts)
+        self._word_count = _fill_count(self._words)
+        self._last_transcript = self._read_last_transcript()
+
+    def _read_last_transcript(self):
+        """Dedup key of the newest stored transcript, so a resume continues it."""
+        if not self._transcript_count:
+            return None
+        entry = self._transcripts[self._transcript_count - 1]
+        with open(os.path.join(self.session_dir, STRINGS_FILENAME), "rb") as f:
+            f.seek(int(entry["offset"]))
+            text = f.read(int(entry["length"])).decode("utf-8")
+        return _transcript_key(float(entry["window_start"]), text)
+
+    def _open_segment(self, segment_no):
+        segment_dir = _segment_dir(self.session_dir, segment_no)
+        os.makedirs(segment_dir, exist_ok=True)
+        self._columns = {}
+        for column in COLUMNS + (TRANSCRIPT_ID_COLUMN,):
+            path = _column_path(segment_dir, column)
+            dtype = _column_dtype(column)
+            if os.path.exists(path):
+                self._columns[column] = np.memmap(path, dtype=dtype, mode="r+")
+                continue
+            mapped = np.memmap(path, dtype=dtype, mode="w+", shape=(self.segment_rows,))
+            mapped[:] = -1 if column == TRANSCRIPT_ID_COLUMN else np.nan
+            self._columns[column] = mapped
+
+    def _grow_index(self, index, filename, dtype, used):
+        """Extend a fixed-width index file by INDEX_GROW_ROWS NaN-filled slots."""
+        path = os.path.join(self.session_dir, filename)
+        capacity = 0 if index is None else len(index)
+        if used < capacity:
+            return index
+        if index is not None:
+            index.flush()
+            del index
+        blank = np.zeros(INDEX_GROW_ROWS, dtype=dtype)
+        key = "timestamp" if "timestamp" in dtype.names else "start"
+        blank[key] = np.nan
+        with open(path, "ab") as f:
+            f.write(blank.tobytes())
+        return np.memmap(path, dtype=dtype, mode="r+")
+
+    def _append_string(self, text):
+        data = text.encode("utf-8")
+        offset = self._strings.tell()
+        self._strings.write(data)
+        return offset, len(data)
+
+    def _record_transcript(self, timestamp, transcript, words, window_start=None):
+        """
+        Store a transcript (and its word timings) once; return its id.
+        Word timings are only kept when window_start is known, since
+        ElevenLabs reports them relative to the captured audio window.
+        """
+        if not transcript:
+            return -1
+        # The same analysis is posted on every tick until the next window, but
+        # two windows can produce the same text ("No."), so key on both.
+        key = _transcript_key(window_start, transcript)
+        if key == self._last_transcript:
+            return self._transcript_count - 1
+
+        self._transcripts = self._grow_index(
+            self._transcripts, TRANSCRIPTS_FILENAME, TRANSCRIPT_DTYPE, self._transcript_count
+        )
+        transcript_id = self._transcript_count
+        offset, length = self._append_string(transcript)
+        entry = self._transcripts[transcript_id]
+        entry["offset"] = offset
+        entry["length"] = length
+        entry["window_start"] = np.nan if window_start is None else window_start
+        entry["timestamp"] = timestamp
+        self._transcript_count += 1
+        self._last_transcript = key
+
+        for word in words if window_start is not None else []:
+            text = word.get("text", "")
+            start = word.get("start")
+            if start is None:
+                continue
+            self._words = self._grow_index(
+                self._words, WORDS_FILENAME, WORD_DTYPE, self._word_count
+            )
+            offset, length = self._append_string(text)
+            entry = self._words[self._word_count]
+            entry["transcript_id"] = transcript_id
+            entry["end"] = window_start + word.get("end", start)
+            entry["offset"] = offset
+            entry["length"] = length
+            entry["start"] = window_start + start
+            self._word_count += 1
+
+        self._strings.flush()
+        return transcript_id
+
+    def append(self, payload):
+        """Record one fused tick, as posted to the backend."""
+        presage = payload.get("metrics", {}).get("presage", {})
+        gemini = payload.get("metrics", {}).get("gemini", {})
+        timestamp = payload.get("timestamp") or time.time()
+
+        if self._row >= self.segment_rows:
+            for mapped in self._columns.values():
+                mapped.flush()
+            self._segment_no += 1
+            self._open_segment(self._segment_no)
+            self._row = 0
+
+        row = self._row
+        columns = self._columns
+        columns["lie_probability"][row] = payload.get("lie_probability", np.nan)
+        columns["heart_rate"][row] = presage.get("heart_rate", np.nan)
+        columns["breathing_rate"][row] = presage.get("breathing_rate", np.nan)
+        columns["stress_index"][row] = presage.get("stress_index", np.nan)
+        columns["engagement"][row] = presage.get("engagement", np.nan)
+        columns["fear"][row] = presage.get("facial_emotions", {}).get("fear", np.nan)
+        columns["deception_score"][row] = gemini.get("deception_score", np.nan)
+        columns[TRANSCRIPT_ID_COLUMN][row] = self._record_transcript(
+            timestamp,
+            payload.get("transcript", ""),
+            gemini.get("words") or [],
+            gemini.get("window_start"),
+        )
+        # Timestamp last: a row only counts once it is fully written.
+        columns["timestamp"][row] = timestamp
+        self._row += 1
+
+    def flush(self):
+        for mapped in self._columns.values():
+            mapped.flush()
+        for index in (self._transcripts, self._words):
+            if index is not None:
+                index.flush()
+        self._strings.flush()
+
+    def close(self):
+        self.flush()
+        self._strings.close()
+
+
+# ---------- Reader ----------
+
+class SessionReader:
+    """Read-only, lazily mapped view of one session directory."""
+
+    def __init__(self, session_dir):
+        self.session_dir = session_dir
+        self.session_id = os.path.basename(os.path.normpath(session_dir))
+        self._segments = []
+        for name in _list_segments(session_dir):
+            segment_dir = os.path.join(session_dir, name)
+            timestamps = np.memmap(
+                _column_path(segment_dir, "timestamp"),
+                dtype=_column_dtype("timestamp"),
+                mode="r",
+            )
+            rows = _valid_rows(timestamps)
+            if rows:
+                self._segments.append((segment_dir, timestamps[:rows]))
+
+    def __len__(self):
+        return sum(len(ts) for _, ts in self._segments)
+
+    def time_span(self):
+        """(first, last) timestamp in the session, or None if empty."""
+        if not self._segments:
+            return None
+        return float(self._segments[0][1][0]), float(self._segments[-1][1][-1])
+
+    def _column(self, segment_dir, column, rows):
+        return np.memmap(
+            _column_path(segment_dir, column), dtype=_column_dtype(column), mode="r"
+        )[:rows]
+
+    def iter_range(self, start=None, end=None, columns=COLUMNS):
+        """Yield per-segment dicts of memmap slices with start <= timestamp < end."""
+        for segment_dir, timestamps in self._segments:
+            lo = 0 if start is None else int(np.searchsorted(timestamps, start, "left"))
+            hi = len(timestamps) if end is None else int(np.searchsorted(timestamps, end, "left"))
+            if lo >= hi:
+                continue
+            yield {
+                column: self._column(segment_dir, column, len(timestamps))[lo:hi]
+                for column in columns
+            }
+
+    def range(self, start=None, end=None, columns=COLUMNS):
+        """Materialise the rows in [start, end) as contiguous arrays."""
+        chunks = list(self.iter_range(start, end, columns))
+        if not chunks:
+            return {
+                column: np.empty(0, _column_dtype(column))
+                for column in columns
+            }
+        return {
+            column: np.concatenate([chunk[column] for chunk in chunks])
+            for column in columns
+        }
+
+    def _read_string(self, blob, offset, length):
+        return bytes(blob[offset : offset + length]).decode("utf-8")
+
+    def transcripts(self, start=None, end=None):
+        """Transcripts (with word timings) first seen in [start, end)."""
+        index = _open_index(
+            os.path.join(self.session_dir, TRANSCRIPTS_FILENAME), TRANSCRIPT_DTYPE, "r"
+        )
+        count = _fill_count(index)
+        if not count:
+            return []
+        index = index[:count]
+        lo = 0 if start is None else int(np.searchsorted(index["timestamp"], start, "left"))
+        hi = count if end is None else int(np.searchsorted(index["timestamp"], end, "left"))
+        if lo >= hi:
+            return []
+
+        blob = np.memmap(
+            os.path.join(self.session_dir, STRINGS_FILENAME), dtype=np.uint8, mode="r"
+        )
+        words = _open_index(os.path.join(self.session_dir, WORDS_FILENAME), WORD_DTYPE, "r")
+        words = words[: _fill_count(words)] if words is not None else None
+
+        results = []
+        for transcript_id in range(lo, hi):
+            entry = index[transcript_id]
+            word_list = []
+            if words is not None and len(words):
+                w_lo = int(np.searchsorted(words["transcript_id"], transcript_id, "left"))
+                w_hi = int(np.searchsorted(words["transcript_id"], transcript_id, "right"))
+                for word in words[w_lo:w_hi]:
+                    word_list.append(
+                        {
+                            "text": self._read_string(blob, int(word["offset"]), int(word["length"])),
+                            "start": float(word["start"]),
+                            "end": float(word["end"]),
+                        }
+                    )
+            results.append(
+                {
+                    "id": transcript_id,
+                    "timestamp": float(entry["timestamp"]),
+                    "window_start": float(entry["window_start"]),
+                    "text": self._read_string(blob, int(entry["offset"]), int(entry["length"])),
+                    "words": word_list,
+                }
+            )
+        return results
+
+
+# ---------- Multi-session queries ----------
+
+def open_sessions(root):
+    """Open every session under root, oldest first."""
+    if not os.path.isdir(root):
+        return []
+    readers = []
+    for name in sorted(os.listdir(root)):
+        session_dir = os.path.join(root, name)
+        if os.path.exists(os.path.join(session_dir, META_FILENAME)):
+            readers.append(SessionReader(session_dir))
+    return readers
+
+
+def aggregate(sessions, column, start=None, end=None):
+    """
+    Streaming count/sum/min/max/mean of one column across sessions.
+    Works segment by segment, so only the pages in range are touched.
+    """
+    count = 0
+    total = 0.0
+    low = np.inf
+    high = -np.inf
+    for session in sessions:
+        for chunk in session.iter_range(start, end, columns=(column,)):
+            values = chunk[column]
+            values = values[~np.isnan(values)]
+            if not len(values):
+                continue
+            count += len(values)
+            total += float(values.sum())
+            low = min(low, float(values.min()))
+            high = max(high, float(values.max()))
+
+    if not count:
+        return {"count": 0, "sum": 0.0, "min": None, "max": None, "mean": None}
+    return {
+        "count": count,
+        "sum": total,
+        "min": low,
+        "max": high,
+        "mean": total / count,
+    }
@@ -0,0 +1,114 @@
+import json
+import sys
+
+import pytest
+
+import ai_inference
+
+
+@pytest.fixture(autouse=True)
+def default_config():
+    ai_inference.apply_config({})
+    yield
+    ai_inference.apply_config({})
+
+
+def test_import_needs_no_hardware_or_config():
+    assert "cv2" not in sys.modules
+    assert "pyaudio" not in sys.modules
+    assert ai_inference.BACKEND_URL == ""
+
+
+def test_apply_config_defaults():
+    assert ai_inference.ELEVENLABS_BASE_URL == "https://api.elevenlabs.io"
+    assert ai_inference.ELEVENLABS_TTS_OUTPUT_FORMAT == "pcm_16000"
+    assert ai_inference.HAT_AUDIO_CALLOUTS_ENABLED is False
+    assert ai_inference.SESSION_STORE_ENABLED is True
+    assert ai_inference.FIRST_WINDOW_SECONDS == 5
+    assert ai_inference.STARTUP_PREWARM_ENABLED is True
+    assert ai_inference.CADENCE_ENABLED is True
+    assert ai_inference.HAT_CALLOUT_ENDPOINT == ""
+
+
+def test_load_config_derives_backend_urls(tmp_path):
+    path = tmp_path / "config.json"
+    path.write_text(json.dumps({
+        "api_endpoint": "http://hat.local:3000/api/pi-data",
+        "gemini_model": "google/gemini-3-flash-preview",
+    }))
+    ai_inference.load_config(str(path))
+    assert ai_inference.BACKEND_BASE_URL == "http://hat.local:3000"
+    assert ai_inference.HAT_CALLOUT_ENDPOINT == "http://hat.local:3000/api/hat-callout"
+    assert ai_inference.GEMINI_MODEL == "gemini-3-flash-preview"
+
+    path.write_text("{}")
+    with pytest.raises(KeyError):
+        ai_inference.load_config(str(path))
+
+
+def test_build_callout_parts():
+    text, insult = ai_inference.build_callout_parts(
+        {"guess": "lie", "player": "Sam", "transcript": "I paid"}
+    )
+    assert text == "Player Sam says you're lying about \"I paid\". Opposite translation: not (I paid)."
+    assert insult in ai_inference.LIE_INSULTS
+
+    text, insult = ai_inference.build_callout_parts({"guess": "Truth"})
+    assert text == (
+        "Player the guesser begrudgingly says you're telling the truth. "
+        "Validated truth on record."
+    )
+    assert insult in ai_inference.TRUTH_INSULTS
+
+    assert ai_inference.build_callout_parts({"guess": "maybe"}) == ("", "")
+    assert ai_inference.build_callout_parts(None) == ("", "")
+
+
+@pytest.fixture
+def callout_env(monkeypatch):
+    ai_inference.apply_config({
+        "hat_audio_callouts_enabled": True,
+        "elevenlabs_api_key": "key",
+        "elevenlabs_voice_id": "voice",
+    })
+    requested = []
+    played = []
+    monkeypatch.setattr(ai_inference, "last_callout_play_ts", 0)
+    monkeypatch.setattr(ai_inference, "tts_cache", {})
+    monkeypatch.setattr(
+        ai_inference,
+        "fetch_hat_callout_from_backend",
+        lambda: {"guess": "truth", "player": "Sam"},
+    )
+    monkeypatch.setattr(
+        ai_inference,
+        "synthesize_speech_elevenlabs",
+        lambda text: requested.append(text) or f"<{text}>".encode(),
+    )
+    monkeypatch.setattr(
+        ai_inference,
+        "play_pcm_audio",
+        lambda audio_bytes, settings: played.append(audio_bytes) or True,
+    )
+    monkeypatch.setattr(ai_inference.random, "choice", lambda pool: pool[0])
+    return requested, played
+
+
+def test_uncached_callout_is_one_tts_request(callout_env):
+    requested, played = callout_env
+    ai_inference.process_hat_callouts()
+    insult = ai_inference.TRUTH_INSULTS[0]
+    assert len(requested) == 1
+    assert requested[0].endswith(insult)
+    assert played == [f"<{requested[0]}>".encode()]
+    assert ai_inference.last_callout_play_ts > 0
+
+
+def test_cached_insult_is_appended_to_synthesized_text(callout_env):
+    requested, played = callout_env
+    insult = ai_inference.TRUTH_INSULTS[0]
+    ai_inference.tts_cache[insult] = b"[cached]"
+    ai_inference.process_hat_callouts()
+    assert len(requested) == 1
+    assert insult not in requested[0]
+    assert played == [f"<{requested[0]}>".encode() + b"[cached]"]
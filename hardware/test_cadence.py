@@ -0,0 +1,186 @@
+import threading
+import time
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+import cadence
+
+QUIET_AUDIO = [np.zeros(1024, np.int16).tobytes()] * 10
+LOUD_AUDIO = [np.full(1024, 8000, np.int16).tobytes()] * 10
+STILL_VIDEO = [np.zeros((48, 64, 3), np.uint8)] * 40
+MOVING_VIDEO = [np.full((48, 64, 3), (i % 2) * 255, np.uint8) for i in range(40)]
+
+
+def fresh_controller(**config):
+    """Controller whose services were all just called, so nothing is stale."""
+    ctl = cadence.CadenceController(config)
+    now = time.time()
+    for service in cadence.SERVICES:
+        ctl.last_call[service] = now
+    return ctl
+
+
+def set_tokens(ctl, tokens):
+    ctl.tokens = tokens
+    ctl._refill_ts = time.monotonic()
+
+
+def test_window_is_an_integer_within_bounds():
+    ctl = cadence.CadenceController()
+    set_tokens(ctl, 0)
+    for stream in ("audio", "video"):
+        window = ctl.window_seconds(stream)
+        assert isinstance(window, int)
+        # Empty bucket at the default 9 calls/min sustains 3 calls per 20 s
+        assert window == 20
+
+
+def test_surplus_shortens_window_and_quiet_stretches_it():
+    ctl = cadence.CadenceController()
+    set_tokens(ctl, ctl.capacity)
+    assert ctl.window_seconds("audio") == ctl.min_window_s
+
+    set_tokens(ctl, ctl.capacity / 2)
+    assert ctl.min_window_s < ctl.window_seconds("audio") < 20
+
+    ctl.audio_active = False
+    assert ctl.window_seconds("audio") == ctl.max_window_s
+    assert ctl.window_seconds("video") < ctl.max_window_s
+
+
+def test_window_never_shorter_than_own_stream_latency():
+    ctl = cadence.CadenceController()
+    set_tokens(ctl, ctl.capacity)
+    ctl.latency["llm"] = 12.4
+    assert ctl.window_seconds("audio") == 13
+    # A slow LLM does not stretch the video windows, and vice versa
+    assert ctl.window_seconds("video") == ctl.min_window_s
+
+    ctl.latency["presage"] = 40.0
+    assert ctl.window_seconds("video") == ctl.max_window_s
+    assert ctl.window_seconds("audio") == 13
+
+
+def test_window_seconds_does_not_touch_the_bucket():
+    ctl = cadence.CadenceController()
+    set_tokens(ctl, 1)
+    refill_ts = ctl._refill_ts
+    ctl.window_seconds("video")
+    assert ctl.tokens == 1
+    assert ctl._refill_ts == refill_ts
+
+
+def test_concurrent_window_reads_do_not_lose_charges():
+    ctl = cadence.CadenceController()
+    ctl.calls_per_minute = 0.0
+    ctl.capacity = 10000.0
+    set_tokens(ctl, 1000.0)
+    stop = threading.Event()
+
+    def capture():
+        while not stop.is_set():
+            ctl.window_seconds("video")
+            ctl._can_afford(("stt",))
+
+    readers = [threading.Thread(target=capture) for _ in range(4)]
+    for reader in readers:
+        reader.start()
+    for _ in range(1000):
+        ctl.record("presage", 0.1)
+    stop.set()
+    for reader in readers:
+        reader.join()
+    assert ctl.tokens == 0.0
+
+
+def test_quiet_audio_is_skipped_once_fresh():
+    ctl = fresh_controller()
+    ctl.plan_audio(QUIET_AUDIO)
+    plan = ctl.plan_audio(QUIET_AUDIO)
+    assert not plan["stt"] and not plan["llm"]
+    assert ctl.skips["stt"] == ctl.skips["llm"] == 2
+
+
+def test_stale_service_is_called_even_when_quiet():
+    ctl = cadence.CadenceController()
+    plan = ctl.plan_audio(QUIET_AUDIO)
+    assert plan["stt"] and plan["llm"]
+
+
+def test_speech_spends_budget_and_runs_out():
+    ctl = fresh_controller()
+    ctl.plan_audio(QUIET_AUDIO)
+    set_tokens(ctl, 2)
+    assert ctl.plan_audio(LOUD_AUDIO)["speech"]
+    ctl.record("stt", 0.5)
+    ctl.record("llm", 1.0)
+
+    set_tokens(ctl, 1)
+    plan = ctl.plan_audio(LOUD_AUDIO)
+    assert plan["llm"] and not plan["stt"]
+
+    set_tokens(ctl, 0)
+    plan = ctl.plan_audio(LOUD_AUDIO)
+    assert not plan["llm"] and not plan["stt"]
+
+    report = ctl.report()
+    assert report["calls"]["stt"] == 1 and report["calls"]["llm"] == 1
+    assert report["cost"] == 2.0
+
+
+def test_costs_weight_the_budget():
+    ctl = fresh_controller(cadence_service_costs={"llm": 3.0})
+    ctl.plan_audio(QUIET_AUDIO)
+    # Enough for STT (1) but not the LLM (3): keep the transcript fresh
+    set_tokens(ctl, 2)
+    plan = ctl.plan_audio(LOUD_AUDIO)
+    assert plan["stt"] and not plan["llm"]
+
+    ctl.record("llm", 1.0)
+    assert ctl.report()["cost"] == 3.0
+
+
+def test_video_skips_still_frames_and_downgrades_when_tight():
+    ctl = fresh_controller()
+    assert not ctl.plan_video(STILL_VIDEO)["presage"]
+
+    set_tokens(ctl, ctl.capacity)
+    plan = ctl.plan_video(MOVING_VIDEO)
+    assert plan["presage"] and plan["frame_step"] == 1
+
+    set_tokens(ctl, 1)
+    plan = ctl.plan_video(MOVING_VIDEO)
+    assert plan["presage"] and plan["frame_step"] == 2 and plan["scale"] == 0.5
+
+
+def test_heart_rate_jump_counts_as_change():
+    ctl = fresh_controller()
+    ctl.observe_heart_rate(70)
+    ctl.observe_heart_rate(95)
+    assert ctl.plan_video(STILL_VIDEO)["presage"]
+
+
+def test_downsample_frames():
+    frames = cadence.downsample_frames(MOVING_VIDEO, frame_step=2, scale=0.5)
+    assert len(frames) == 20
+    assert frames[0].shape == (24, 32, 3)
+    assert frames[0].flags["C_CONTIGUOUS"]
+
+
+def test_slow_llm_keeps_transcript_when_only_one_call_fits():
+    ctl = fresh_controller()
+    ctl.plan_audio(QUIET_AUDIO)
+    ctl.latency["llm"] = 25.0
+    set_tokens(ctl, 1)
+    plan = ctl.plan_audio(LOUD_AUDIO)
+    assert plan["stt"] and not plan["llm"]
+
+
+def test_slow_presage_is_downgraded_even_with_budget():
+    ctl = fresh_controller()
+    set_tokens(ctl, ctl.capacity)
+    ctl.latency["presage"] = 12.0
+    plan = ctl.plan_video(MOVING_VIDEO)
+    assert plan["presage"] and plan["frame_step"] == 2
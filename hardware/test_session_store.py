@@ -0,0 +1,140 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+import session_store
+
+
+def make_payload(i, transcript="", words=None, window_start=None):
+    gemini = {"deception_score": 0.1 * i}
+    if words is not None:
+        gemini["words"] = words
+    if window_start is not None:
+        gemini["window_start"] = window_start
+    return {
+        "lie_probability": float(i),
+        "timestamp": 1000.0 + i * 0.5,
+        "transcript": transcript,
+        "metrics": {
+            "presage": {
+                "heart_rate": 80 + i,
+                "stress_index": 0.5,
+                "facial_emotions": {"fear": 0.2},
+            },
+            "gemini": gemini,
+        },
+    }
+
+
+def test_round_trip_across_segments(tmp_path):
+    writer = session_store.SessionWriter(str(tmp_path), "game", segment_rows=4)
+    for i in range(10):
+        writer.append(make_payload(i))
+    writer.close()
+
+    reader = session_store.SessionReader(str(tmp_path / "game"))
+    assert len(reader) == 10
+    assert reader.time_span() == (1000.0, 1004.5)
+
+    rows = reader.range(1001.0, 1003.0, ("timestamp", "lie_probability"))
+    assert rows["timestamp"].tolist() == [1001.0, 1001.5, 1002.0, 1002.5]
+    assert rows["lie_probability"].tolist() == [2.0, 3.0, 4.0, 5.0]
+
+    empty = reader.range(2000.0, 3000.0)
+    assert all(len(values) == 0 for values in empty.values())
+
+
+def test_resume_appends_after_existing_rows(tmp_path):
+    writer = session_store.SessionWriter(str(tmp_path), "game", segment_rows=4)
+    for i in range(5):
+        writer.append(make_payload(i, transcript="first"))
+    writer.close()
+
+    # segment_rows comes from meta.json when resuming
+    writer = session_store.SessionWriter(str(tmp_path), "game")
+    assert writer.segment_rows == 4
+    for i in range(5, 7):
+        writer.append(make_payload(i, transcript="second"))
+    writer.close()
+
+    reader = session_store.SessionReader(str(tmp_path / "game"))
+    assert len(reader) == 7
+    assert reader.range(columns=("heart_rate",))["heart_rate"].tolist() == [
+        80.0, 81.0, 82.0, 83.0, 84.0, 85.0, 86.0,
+    ]
+    assert [t["text"] for t in reader.transcripts()] == ["first", "second"]
+
+
+def test_transcripts_stored_once_with_absolute_word_times(tmp_path):
+    words = [{"text": "héllo", "start": 0.5, "end": 0.9}]
+    writer = session_store.SessionWriter(str(tmp_path), "game")
+    for i in range(3):
+        writer.append(make_payload(i, "héllo", words, window_start=990.0))
+    writer.append(make_payload(3, "no timing", words))
+    writer.close()
+
+    reader = session_store.SessionReader(str(tmp_path / "game"))
+    ids = reader.range(columns=(session_store.TRANSCRIPT_ID_COLUMN,))
+    assert ids[session_store.TRANSCRIPT_ID_COLUMN].tolist() == [0, 0, 0, 1]
+
+    first, second = reader.transcripts()
+    assert first["text"] == "héllo"
+    assert first["timestamp"] == 1000.0
+    assert first["window_start"] == 990.0
+    assert first["words"] == [{"text": "héllo", "start": 990.5, "end": 990.9}]
+    # Without a window start the relative word times cannot be placed
+    assert second["words"] == []
+
+    assert [t["text"] for t in reader.transcripts(start=1001.0)] == ["no timing"]
+
+
+def test_aggregate_across_sessions(tmp_path):
+    for name, offset in (("a", 0), ("b", 10)):
+        writer = session_store.SessionWriter(str(tmp_path), name, segment_rows=3)
+        for i in range(4):
+            writer.append(make_payload(i + offset))
+        writer.close()
+
+    sessions = session_store.open_sessions(str(tmp_path))
+    assert [s.session_id for s in sessions] == ["a", "b"]
+
+    stats = session_store.aggregate(sessions, "heart_rate")
+    assert stats["count"] == 8
+    assert stats["min"] == 80.0
+    assert stats["max"] == 93.0
+    assert stats["mean"] == pytest.approx((80 + 81 + 82 + 83 + 90 + 91 + 92 + 93) / 8)
+
+    assert session_store.aggregate(sessions, "heart_rate", 5000.0)["count"] == 0
+
+
+def test_same_text_from_separate_windows_is_kept(tmp_path):
+    writer = session_store.SessionWriter(str(tmp_path), "game")
+    for i in range(2):
+        writer.append(make_payload(i, "No.", [{"text": "No.", "start": 0.2, "end": 0.4}], 990.0))
+    for i in range(2, 4):
+        writer.append(make_payload(i, "No.", [{"text": "No.", "start": 0.1, "end": 0.3}], 1000.0))
+    writer.close()
+
+    reader = session_store.SessionReader(str(tmp_path / "game"))
+    ids = reader.range(columns=(session_store.TRANSCRIPT_ID_COLUMN,))
+    assert ids[session_store.TRANSCRIPT_ID_COLUMN].tolist() == [0, 0, 1, 1]
+    first, second = reader.transcripts()
+    assert (first["window_start"], second["window_start"]) == (990.0, 1000.0)
+    assert first["words"][0]["start"] == pytest.approx(990.2)
+    assert second["words"][0]["start"] == pytest.approx(1000.1)
+
+
+def test_resume_does_not_duplicate_current_transcript(tmp_path):
+    words = [{"text": "yes", "start": 0.0, "end": 0.2}]
+    writer = session_store.SessionWriter(str(tmp_path), "game")
+    writer.append(make_payload(0, "yes", words, 990.0))
+    writer.close()
+
+    writer = session_store.SessionWriter(str(tmp_path), "game")
+    writer.append(make_payload(1, "yes", words, 990.0))
+    writer.close()
+
+    reader = session_store.SessionReader(str(tmp_path / "game"))
+    assert len(reader.transcripts()) == 1
+    ids = reader.range(columns=(session_store.TRANSCRIPT_ID_COLUMN,))
+    assert ids[session_store.TRANSCRIPT_ID_COLUMN].tolist() == [0, 0]